@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Единая точка входа: python ff.py --action deposit | cooldown
+# Импортируется только нужный скрипт (ff_deposit.py / ff_cooldown.py); конфиг — в нём.
+
+import argparse
+import importlib
+
+ACTIONS = {
+    "deposit": "ff_deposit",    # Approve + Deposit $FF
+    "cooldown": "ff_cooldown",  # cooldownShares — инициация Unstake
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="FF stake: deposit / cooldown для всех кошельков из keys.txt")
+    parser.add_argument("--action", required=True, choices=sorted(ACTIONS))
+    args = parser.parse_args()
+    importlib.import_module(ACTIONS[args.action]).main()
+
+if __name__ == "__main__":
+    main()
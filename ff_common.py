@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+#
+# Общий код ff_deposit.py / ff_cooldown.py (Ethereum Mainnet, chainId=1):
+# nonce-менеджер, комиссии, отправка с RBF, ожидание квитанций, ключи, web3, пакетное
+# чтение состояния кошельков и параллельный прогон по кошелькам.
+# В самих скриптах остаются только их конфиг и бизнес-логика.
+#
+# Требования: pip install "web3>=7" python-dotenv aiohttp "coincurve>=18"
+
+import asyncio
+import functools
+import logging
+import os
+import queue
+import re
+import struct
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+import aiohttp
+from dotenv import load_dotenv
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3.exceptions import MethodUnavailable
+from web3.providers.rpc.utils import ExceptionRetryConfiguration
+from eth_account import Account
+from eth_utils import is_checksum_address
+
+ETH_CHAIN_ID = 1
+MIN_WEI = 30_000_000_000_000  # 0.00003 ETH — минимальный запас на газ (примерно), проверка перед отправкой
+BLOCK_POLL = 1.0    # сек между eth_blockNumber при ожидании квитанций (один опрос на все кошельки)
+FEE_TTL = 8.0       # сек: fee_history одна на все кошельки в пределах ~блока
+BATCH_WALLETS = 50  # кошельков в одном JSON-RPC batch (у провайдеров есть лимит на размер batch)
+# только чтение: eth_sendRawTransaction не повторяем — нода могла принять tx, а ответ потеряться
+RETRY_METHODS = (
+    "eth_chainId", "eth_blockNumber", "eth_getBalance", "eth_call", "eth_getTransactionCount",
+    "eth_getTransactionReceipt", "eth_getBlockReceipts", "eth_feeHistory", "eth_gasPrice", "eth_estimateGas",
+)
+
+# Адреса (Vault = sFF ERC20 + прокси контракта)
+ADDR_FF_TOKEN = "0xFA1C09fC8B491B6A4d3Ff53A10CAd29381b3F949"
+ADDR_VAULT    = "0x1a0C3FfCbd101c6f2f6650DED9964c4A568C4D72"
+if __debug__:
+    assert is_checksum_address(ADDR_FF_TOKEN) and is_checksum_address(ADDR_VAULT)
+
+# ABI (sFF — тоже ERC20, на том же прокси, что и vault)
+ABI_ERC20 = [
+    {"name":"balanceOf","type":"function","stateMutability":"view","inputs":[{"name":"owner","type":"address"}],"outputs":[{"type":"uint256"}]},
+    {"name":"allowance","type":"function","stateMutability":"view","inputs":[{"name":"owner","type":"address"},{"name":"spender","type":"address"}],"outputs":[{"type":"uint256"}]},
+    {"name":"approve","type":"function","stateMutability":"nonpayable","inputs":[{"name":"spender","type":"address"},{"name":"amount","type":"uint256"}],"outputs":[]},
+    {"name":"decimals","type":"function","stateMutability":"view","inputs":[],"outputs":[{"type":"uint8"}]},
+    {"name":"symbol","type":"function","stateMutability":"view","inputs":[],"outputs":[{"type":"string"}]},
+]
+_ABIS = {"erc20": ABI_ERC20}
+
+@functools.lru_cache(maxsize=32)
+def get_contract(w3: AsyncWeb3, address: str, abi_key: str = "erc20"):
+    # Contract разбирает ABI при создании — один объект на (w3, адрес, ABI) на весь прогон
+    return w3.eth.contract(address=address, abi=_ABIS[abi_key])
+
+# -------- Logging --------
+# вывод идёт через очередь: корутины и потоки подписи только кладут записи,
+# в stdout пишет один поток QueueListener
+log = logging.getLogger("ff")
+
+def wallet_log(address: str) -> logging.Logger:
+    # ff.0x1234ab — у каждого кошелька свой логгер, строки удобно grep-ать
+    return log.getChild(address[:8])
+
+def start_logging() -> QueueListener:
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+    listener = QueueListener(q, handler)
+    log.addHandler(QueueHandler(q))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener.start()
+    return listener
+
+# calldata собирается вручную (селектор + 32-байтные слова ABI); селекторы — в скриптах
+_PACK = struct.Struct(">4s32s32s")   # селектор + два слова ABI — форма всех наших вызовов
+
+def uint_word(v: int) -> bytes:
+    return v.to_bytes(32, "big")
+
+@functools.lru_cache(maxsize=None)
+def addr_word(addr: str) -> bytes:
+    # адрес дополняется до 32 байт один раз на кошелёк/контракт
+    return b"\x00" * 12 + bytes.fromhex(addr[2:])
+
+def calldata(sel: bytes, word1: bytes, word2: bytes) -> str:
+    return "0x" + _PACK.pack(sel, word1, word2).hex()
+
+# -------- Nonce Manager --------
+class NonceManager:
+    def __init__(self, address: str, nonce: int):
+        self.address = address
+        self._nonce = nonce
+    def current(self) -> int:
+        return self._nonce
+    def next(self) -> int:
+        n = self._nonce
+        self._nonce += 1
+        return n
+
+# -------- Utils: eth-account compatibility --------
+def signed_raw_tx_bytes(signed) -> bytes:
+    try:
+        return signed.raw_transaction     # eth-account >= 0.12
+    except AttributeError:
+        return signed.rawTransaction      # старые eth-account
+
+# -------- Fees helpers --------
+_fee_lock: Optional[asyncio.Lock] = None
+_fee_cache: Dict[str, Any] = {"ts": 0.0, "key": None, "val": None}
+
+async def suggest_fees(w3: AsyncWeb3, priority_gwei: float) -> Dict[str, int]:
+    # базовая комиссия одинакова для всех кошельков в одном блоке — кэшируем на FEE_TTL секунд
+    global _fee_lock
+    if _fee_lock is None:
+        _fee_lock = asyncio.Lock()   # создаём внутри работающего event loop
+    async with _fee_lock:
+        now = time.monotonic()
+        if _fee_cache["key"] == priority_gwei and now - _fee_cache["ts"] < FEE_TTL:
+            return dict(_fee_cache["val"])
+        fees = await _fetch_fees(w3, priority_gwei)
+        _fee_cache.update(ts=now, key=priority_gwei, val=fees)
+        return dict(fees)
+
+async def _fetch_fees(w3: AsyncWeb3, priority_gwei: float) -> Dict[str, int]:
+    try:
+        fh = await w3.eth.fee_history(3, "latest")
+        base = int(fh["baseFeePerGas"][-1])
+    except Exception:
+        base = int(await w3.eth.gas_price)
+    priority = int(priority_gwei * 10**9)
+    return {"maxPriorityFeePerGas": priority, "maxFeePerGas": base + priority * 2}
+
+def bump_fees(fees: Dict[str, int], bump_pct: int) -> Dict[str, int]:
+    return {
+        "maxPriorityFeePerGas": fees["maxPriorityFeePerGas"] * (100 + bump_pct) // 100,
+        "maxFeePerGas": fees["maxFeePerGas"] * (100 + bump_pct) // 100,
+    }
+
+async def estimate_gas_safe(w3: AsyncWeb3, tx: Dict[str, Any], fallback_gas: Optional[int] = None) -> int:
+    try:
+        gas_est = await w3.eth.estimate_gas(tx)
+        return gas_est * 110 // 100
+    except Exception:
+        if fallback_gas is None:
+            raise
+        return fallback_gas
+
+# -------- Receipt tracker --------
+class InflightTracker:
+    # Один опрос сети на все кошельки вместо eth_getTransactionReceipt от каждого: следим за
+    # eth_blockNumber и на каждый новый блок берём eth_getBlockReceipts, раздавая квитанции
+    # ожидающим tx. Если провайдер не умеет eth_getBlockReceipts — раз в блок один сырой batch
+    # eth_getTransactionReceipt по всем ещё не найденным хэшам и по обычному запросу на каждую
+    # найденную квитанцию; без поддержки batch — запрос на каждый ожидающий хэш в каждом блоке.
+    # Ошибка при просмотре блоков (429, таймаут) — тот же диапазон повторяется на следующем тике.
+    def __init__(self, w3: AsyncWeb3, poll_interval: float = BLOCK_POLL):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self._waiters: Dict[bytes, asyncio.Future] = {}
+        self._last_block: Optional[int] = None
+        self._block_receipts = True
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, tx_hash) -> asyncio.Future:
+        # регистрировать до отправки: иначе tx может попасть в уже просмотренный блок
+        key = bytes(tx_hash)
+        fut = self._waiters.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters[key] = fut
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return fut
+
+    async def wait_for(self, tx_hashes: List, timeout: float):
+        # квитанция первой из tx_hashes (исходная tx и её RBF-замены), либо None по таймауту
+        futs = [self.watch(h) for h in tx_hashes]
+        done, _ = await asyncio.wait(futs, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        return next(iter(done)).result() if done else None
+
+    def forget(self, tx_hashes: List) -> None:
+        for h in tx_hashes:
+            self._waiters.pop(bytes(h), None)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pending(self) -> List[bytes]:
+        return [h for h, fut in self._waiters.items() if not fut.done()]
+
+    def _resolve(self, rcpt) -> None:
+        fut = self._waiters.get(bytes(rcpt.transactionHash))
+        if fut is not None and not fut.done():
+            fut.set_result(rcpt)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                head = await self.w3.eth.block_number
+                if self._last_block is None:
+                    self._last_block = head - 1
+                if head > self._last_block:
+                    if self._pending():
+                        await self._scan(self._last_block + 1, head)
+                    else:
+                        self._last_block = head
+            except Exception:
+                pass   # _last_block не сдвинут — непросмотренные блоки возьмём на следующем тике
+            await asyncio.sleep(self.poll_interval)
+
+    async def _scan(self, first: int, last: int) -> None:
+        # _last_block сдвигается только за успешно просмотренными блоками
+        if self._block_receipts:
+            try:
+                for n in range(first, last + 1):
+                    for rcpt in await self.w3.eth.get_block_receipts(n):
+                        self._resolve(rcpt)
+                    self._last_block = n
+                return
+            except Exception as e:
+                if not _method_unsupported(e):
+                    raise
+                self._block_receipts = False   # метод не поддерживается — дальше по хэшам
+        hashes = self._pending()
+        try:
+            # сырой JSON-RPC: у ещё не добытой tx result = null, его просто пропускаем
+            # (w3.batch_requests() на null бросает TransactionNotFound и роняет всю пачку)
+            out = await self.w3.provider.make_batch_request(
+                [("eth_getTransactionReceipt", ["0x" + h.hex()]) for h in hashes])
+            if not isinstance(out, list):
+                raise ValueError(out)   # вместо пачки — одна ошибка: batch не поддерживается
+            mined = [bytes.fromhex(r["result"]["transactionHash"][2:])
+                     for r in out if isinstance(r, dict) and r.get("result")]
+        except Exception:
+            mined = hashes   # batch не поддерживается — по одному, параллельно
+        # отформатированную квитанцию запрашиваем только у найденных
+        receipts = await asyncio.gather(*(self.w3.eth.get_transaction_receipt(h) for h in mined),
+                                        return_exceptions=True)
+        for rcpt in receipts:
+            if rcpt is not None and not isinstance(rcpt, Exception):
+                self._resolve(rcpt)
+        self._last_block = last
+
+def _method_unsupported(e: Exception) -> bool:
+    # только «метода нет» (-32601 / MethodUnavailable); 429, таймауты и «header not found» — временные
+    if isinstance(e, MethodUnavailable):
+        return True
+    err = getattr(e, "rpc_response", None) or (e.args[0] if e.args else None)
+    if isinstance(err, dict):
+        err = err.get("error", err)
+        if isinstance(err, dict) and err.get("code") == -32601:
+            return True
+    msg = str(e).lower()
+    return "method" in msg and any(s in msg for s in ("not found", "not supported", "unsupported", "does not exist"))
+
+_tracker: Optional[InflightTracker] = None
+
+def get_tracker(w3: AsyncWeb3) -> InflightTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = InflightTracker(w3)
+    return _tracker
+
+async def close_tracker() -> None:
+    if _tracker is not None:
+        await _tracker.close()
+
+# -------- Sender with RBF --------
+class PendingTx:
+    # отправленная, но ещё не подтверждённая tx: всё, что нужно для ожидания квитанции и RBF
+    def __init__(self, tx: Dict[str, Any], tag: str, tx_hash, tx_hex: str):
+        self.tx = tx
+        self.tag = tag
+        self.tx_hash = tx_hash
+        self.tx_hex = tx_hex
+
+def _already_known(e: Exception) -> bool:
+    msg = str(e).lower()
+    return "already known" in msg or "known transaction" in msg
+
+async def _broadcast(w3: AsyncWeb3, account, tx: Dict[str, Any], tag: str, signed=None) -> PendingTx:
+    if signed is None:
+        # ECDSA-подпись — в пуле потоков, чтобы не стопорить event loop (с coincurve это libsecp256k1)
+        signed = await asyncio.to_thread(account.sign_transaction, tx)
+    raw = signed_raw_tx_bytes(signed)
+    get_tracker(w3).watch(signed.hash)
+    try:
+        tx_hash = await w3.eth.send_raw_transaction(raw)
+    except Exception as e:
+        # ответ на прошлую отправку потерялся, но нода tx приняла — это успех, хэш тот же
+        if not _already_known(e):
+            get_tracker(w3).forget([signed.hash])   # не ушла — и ждать её незачем
+            raise
+        tx_hash = signed.hash
+    # bytes(): HexBytes.hex() в разных версиях то с "0x", то без; у чистых bytes — всегда без
+    tx_hex = "0x" + bytes(tx_hash).hex()
+    logger = wallet_log(account.address)
+    logger.info(f"  -> {tag}: отправлено {tx_hex}")
+    logger.info(f"     ссылка: https://etherscan.io/tx/{tx_hex}")
+    return PendingTx(tx, tag, tx_hash, tx_hex)
+
+async def _prepare_tx(w3: AsyncWeb3, nonce_mgr: NonceManager, tx_fields: Dict[str, Any]) -> Dict[str, Any]:
+    tx = dict(tx_fields)
+    tx["nonce"] = nonce_mgr.next()
+    # FF_ESTIMATE=1 — eth_estimateGas перед каждой tx; иначе фиксированный лимит без лишнего RPC
+    gas = tx.pop("gas", None)
+    if gas is None or os.getenv("FF_ESTIMATE") == "1":
+        gas = await estimate_gas_safe(w3, tx, fallback_gas=gas or 140000)
+    tx["gas"] = gas
+    wallet_log(nonce_mgr.address).info(f"    gas={tx['gas']} maxFeePerGas={tx['maxFeePerGas']} maxPriorityFeePerGas={tx['maxPriorityFeePerGas']}")
+    return tx
+
+async def submit_tx(w3: AsyncWeb3, account, nonce_mgr: NonceManager, tx_fields: Dict[str, Any], tag: str) -> PendingTx:
+    # только подписать и отправить; квитанцию ждёт wait_with_rbf — можно отправить следующую tx сразу
+    tx = await _prepare_tx(w3, nonce_mgr, tx_fields)
+    return await _broadcast(w3, account, tx, tag)
+
+async def submit_batch(w3: AsyncWeb3, account, nonce_mgr: NonceManager,
+                       items: List[Tuple[Dict[str, Any], str]]) -> List[PendingTx]:
+    # несколько tx одного кошелька: nonce подряд, подписи параллельно заранее, отправка по порядку nonce
+    txs = [await _prepare_tx(w3, nonce_mgr, fields) for fields, _ in items]
+    signed = await asyncio.gather(*(asyncio.to_thread(account.sign_transaction, tx) for tx in txs))
+    pending = []
+    for tx, (_, tag), s in zip(txs, items, signed):
+        try:
+            pending.append(await _broadcast(w3, account, tx, tag, s))
+        except Exception as e:
+            if not pending:
+                raise
+            # уже отправленные tx возвращаем — их квитанции (и RBF) ждёт вызывающий;
+            # следующие по nonce без этой всё равно не пройдут
+            wallet_log(account.address).error(f"  -> {tag}: отправка не удалась: {e}; остальные tx пачки не отправлены")
+            break
+    return pending
+
+async def wait_with_rbf(w3: AsyncWeb3, account, pending: PendingTx,
+                        max_wait: int, max_retries: int, bump_pct: int) -> str:
+    tag = pending.tag
+    logger = wallet_log(account.address)
+    fees = {"maxPriorityFeePerGas": pending.tx["maxPriorityFeePerGas"], "maxFeePerGas": pending.tx["maxFeePerGas"]}
+    # при RBF меняются только комиссии: остальные поля собираем один раз, каждая замена — новый dict,
+    # уже отправленная tx (pending.tx) не мутирует
+    tx_common = {k: v for k, v in pending.tx.items() if k not in fees}
+
+    sent = [pending]
+    attempt = 0
+    try:
+        while True:
+            # квитанцию ищет общий InflightTracker; годится любая из отправленных версий (RBF могла не успеть)
+            rcpt = await get_tracker(w3).wait_for([p.tx_hash for p in sent], timeout=max_wait)
+            if rcpt is not None:
+                mined = next((p for p in sent if bytes(p.tx_hash) == bytes(rcpt.transactionHash)), pending)
+                if rcpt.status == 1:
+                    logger.info(f"     {tag}: ✅ success (block={rcpt.blockNumber}, gasUsed={rcpt.gasUsed})")
+                else:
+                    logger.warning(f"     {tag}: ❌ failed (status=0, block={rcpt.blockNumber})")
+                return mined.tx_hex
+
+            attempt += 1
+            if attempt > max_retries:
+                logger.warning(f"     {tag}: ⚠️ квитанция не получена за {max_wait}s после {max_retries} RBF-попыток.")
+                return pending.tx_hex
+            # замена уходит с тем же tx["nonce"]; nonce_mgr не откатываем — следующие tx кошелька уже могут быть в пути
+            fees = bump_fees(fees, bump_pct)
+            tx = {**tx_common, **fees}
+            logger.info(f"     {tag}: RBF bump +{bump_pct}% → maxFeePerGas={tx['maxFeePerGas']} maxPriority={tx['maxPriorityFeePerGas']}")
+            try:
+                pending = await _broadcast(w3, account, tx, tag)
+            except Exception as e:
+                # замену могут отвергнуть («nonce too low»), если исходная tx как раз попала в блок:
+                # продолжаем ждать уже отправленные версии
+                logger.warning(f"     {tag}: ⚠️ замена не принята: {e}")
+                continue
+            sent.append(pending)
+    finally:
+        get_tracker(w3).forget([p.tx_hash for p in sent])   # ответ получен или ждать больше не будем
+
+async def send_with_rbf(w3: AsyncWeb3, account, nonce_mgr: NonceManager, tx_fields: Dict[str, Any], tag: str,
+                        max_wait: int, max_retries: int, bump_pct: int) -> str:
+    pending = await submit_tx(w3, account, nonce_mgr, tx_fields, tag)
+    return await wait_with_rbf(w3, account, pending, max_wait, max_retries, bump_pct)
+
+# -------- Web3 init / keys --------
+_KEY_RE = re.compile(r"0x[0-9a-fA-F]{64}")
+
+def load_keys(path: str = "keys.txt"):
+    with open(path, "rb") as f:
+        data = f.read().decode("utf-8-sig")
+    lines = [s for s in (line.strip() for line in data.splitlines()) if s]
+    bad = [s for s in lines if not _KEY_RE.fullmatch(s)]
+    if bad:
+        raise ValueError(f"Неверный приватный ключ: {bad[0][:12]}... (всего неверных строк: {len(bad)})")
+    # дубликаты убираем: один ключ у двух параллельных обработчиков = коллизия nonce
+    keys = list(dict.fromkeys(s.lower() for s in lines))
+    if not keys:
+        raise RuntimeError("keys.txt пуст.")
+    return keys
+
+async def build_w3() -> AsyncWeb3:
+    load_dotenv()
+    rpc = os.getenv("ETH_RPC")
+    if not rpc:
+        raise RuntimeError("Укажите ETH_RPC в .env")
+    # одна keep-alive сессия на все кошельки: пул с запасом, чтобы не открывать новые TCP+TLS
+    # соединения; сетевые ошибки и 429/5xx на чтении повторяем с паузой (отправку tx — нет)
+    provider = AsyncHTTPProvider(
+        rpc,
+        request_kwargs={"timeout": aiohttp.ClientTimeout(total=60)},
+        exception_retry_configuration=ExceptionRetryConfiguration(
+            errors=(aiohttp.ClientError, asyncio.TimeoutError), retries=3, backoff_factor=0.2,
+            method_allowlist=list(RETRY_METHODS)),
+    )
+    await provider.cache_async_session(aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64)))
+    w3 = AsyncWeb3(provider)
+    try:
+        chain_id = await w3.eth.chain_id
+    except Exception:
+        chain_id = None
+    if chain_id and chain_id != ETH_CHAIN_ID:
+        log.warning(f"ВНИМАНИЕ: chain_id={chain_id}, ожидается {ETH_CHAIN_ID} (Ethereum Mainnet)")
+        await asyncio.sleep(1.0)
+    return w3
+
+async def prefetch_wallets(w3: AsyncWeb3, addrs: List[str],
+                          views: Callable[[str], List]) -> List[Dict[str, Any]]:
+    # ETH-баланс, view-вызовы скрипта (views(addr) -> [ContractFunction, ...]) и pending nonce
+    # всех кошельков — пачками JSON-RPC batch вместо запроса на каждое значение;
+    # если RPC не умеет batch или в пачке ошибка — по кошельку, параллельно. Кошелёк, который
+    # прочитать не удалось, получает {"error": ...} и пропускается, остальные работают.
+    res: List[Dict[str, Any]] = []
+    for i in range(0, len(addrs), BATCH_WALLETS):
+        chunk = addrs[i:i + BATCH_WALLETS]
+        fns = [views(a) for a in chunk]
+        try:
+            async with w3.batch_requests() as batch:
+                for a, calls in zip(chunk, fns):
+                    batch.add(w3.eth.get_balance(a))
+                    for fn in calls:
+                        batch.add(fn)
+                    batch.add(w3.eth.get_transaction_count(a, "pending"))
+                out = await batch.async_execute()
+            rows = []
+            j = 0
+            for calls in fns:
+                n = len(calls)
+                rows.append({"eth": int(out[j]), "views": [int(x) for x in out[j + 1:j + 1 + n]],
+                             "nonce": int(out[j + 1 + n])})
+                j += n + 2
+        except Exception:
+            rows = await asyncio.gather(*(_fetch_wallet(w3, a, calls) for a, calls in zip(chunk, fns)))
+        res += rows
+    return res
+
+async def _fetch_wallet(w3: AsyncWeb3, addr: str, calls: List) -> Dict[str, Any]:
+    try:
+        return {"eth": int(await w3.eth.get_balance(addr)),
+                "views": [int(await fn.call()) for fn in calls],
+                "nonce": int(await w3.eth.get_transaction_count(addr, block_identifier="pending"))}
+    except Exception as e:
+        return {"error": e}
+
+# -------- Runner --------
+ProcessWallet = Callable[[Any, AsyncWeb3, Dict[str, Any], NonceManager], Awaitable[None]]
+
+async def run_wallets(w3: AsyncWeb3, keys: List[str],
+                      views: Callable[[str], List], process_wallet: ProcessWallet) -> None:
+    accounts = [Account.from_key(pk) for pk in keys]
+    states = await prefetch_wallets(w3, [a.address for a in accounts], views)
+
+    # все кошельки — корутины одного event loop; FF_POOL ограничивает, сколько идут одновременно
+    sem = asyncio.Semaphore(int(os.getenv("FF_POOL", "32")))
+
+    async def one(idx: int, acct, state: Dict[str, Any]) -> None:
+        async with sem:
+            if "error" in state:
+                wallet_log(acct.address).error(
+                    f"=== Wallet #{idx}: {acct.address}: не удалось прочитать состояние: {state['error']} — пропуск ===")
+                return
+            nonce_mgr = NonceManager(acct.address, state["nonce"])
+            logger = wallet_log(acct.address)
+            logger.info(f"=== Wallet #{idx}: {acct.address} (start pending nonce={nonce_mgr.current()}) ===")
+
+            eth_wei = state["eth"]
+            if eth_wei < MIN_WEI:
+                logger.warning(f"  ⚠️ На кошельке мало ETH для газа: {eth_wei / 1e18:.6f} ETH < {MIN_WEI / 1e18:.6f} ETH — пропуск")
+                return
+
+            try:
+                await process_wallet(acct, w3, state, nonce_mgr)
+            except Exception as e:
+                logger.error(f"=== Кошелёк {acct.address}: непредвиденная ошибка: {e} ===")
+
+    await asyncio.gather(*(one(idx, acct, state)
+                           for idx, (acct, state) in enumerate(zip(accounts, states), 1)),
+                         return_exceptions=True)
+
+async def shutdown(w3: AsyncWeb3) -> None:
+    await close_tracker()
+    await w3.provider.disconnect()